@@ -1,30 +1,56 @@
-import io
+import asyncio
+import json
+import uuid
 from contextlib import asynccontextmanager
 from typing import Optional
 
-from PIL import Image
-from fastapi import FastAPI, Depends, UploadFile, File
+from fastapi import FastAPI, Depends, UploadFile, File, Form, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from loguru import logger
 from sqlalchemy import func
 from sqlmodel import Session, select
 
+from app.core.checkpointer import open_checkpointer, close_checkpointer, prune_checkpoints, delete_checkpoints
 from app.core.config import Config
-from app.core.db import get_session, init_db
-from app.workflows.object_permanence.state import State
-from app.workflows.object_permanence.workflow import create_compiled_state_graph
+from app.core.constants import Constants
+from app.core.db import engine, get_session
+from app.core.embeddings import check_embedding_provider
+
+# The workflow modules (LangChain, LangGraph, OpenCV, scikit-image, ...) are heavy,
+# so they are imported on first use, or up front by `warm_up` in the gunicorn master
+# (see gunicorn.conf.py). The database schema is created once per deployment by
+# `python -m app.bootstrap`.
+
+
+async def prune_checkpoints_periodically():
+    while True:
+        try:
+            await run_in_threadpool(prune_checkpoints, Config.CHECKPOINT_TTL_HOURS)
+        except Exception as e:
+            logger.error(f"Failed to prune workflow checkpoints: {e}")
+        await asyncio.sleep(Constants.CHECKPOINT_PRUNE_INTERVAL_SECONDS)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # On Startup
 
-    # Setup the database
-    init_db()
+    # Refuse to start if the embedding provider does not match the database
+    check_embedding_provider()
+
+    # Open the workflow checkpointer's connection pool
+    open_checkpointer()
+
+    # Delete the checkpoints of old workflow runs in the background
+    prune_task = asyncio.create_task(prune_checkpoints_periodically())
 
     yield
 
     # On Shutdown
-    pass
+    prune_task.cancel()
+    close_checkpointer()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -59,11 +85,60 @@ def get_db_version(session: Session = Depends(get_session)):
         return {"error": f"Database connection failed: {e}"}
 
 
+def get_workflow_config(tenant_id: str, run_id: str, session: Session) -> dict:
+    """
+    Builds the LangGraph run configuration for a workflow run. The checkpoint thread id
+    is scoped to the tenant, so runs of different patients can never collide. Both ids
+    are free-form, so the pair is JSON encoded rather than joined with a separator that
+    either id could contain. The database session is handed to the nodes through a
+    callback so that it never becomes part of the checkpointed state.
+    """
+    return {
+        "configurable": {
+            "thread_id": json.dumps([tenant_id, run_id]),
+            "run_id": run_id,
+            "get_db_session": lambda: session,
+        }
+    }
+
+
+async def store_frame(frame: UploadFile, frame_id: Optional[str] = None) -> str:
+    """
+    Decodes an uploaded frame into the frame store, off the event loop, and rejects
+    uploads that are not valid images with a 422.
+    """
+    from app.workflows.object_permanence.frame_store import frame_store
+
+    data = await frame.read()
+    try:
+        return await run_in_threadpool(frame_store.put, data, frame_id)
+    except OSError as e:
+        # Raised by PIL for unidentified (`UnidentifiedImageError`) and truncated images.
+        raise HTTPException(status_code=422, detail=f"Invalid image upload {frame.filename}: {e}")
+
+
+@app.get("/api/tenants/{tenant_id}/gating")
+def get_gating_metrics(tenant_id: str):
+    """
+    Returns the adaptive similarity gate statistics of every device of a tenant,
+    including the current threshold, the analysis rate of the last hour and the most
+    recent decision. The gates are stored in the database and
+    shared by all workers, so the statistics cover every frame of a device whichever
+    worker handled it.
+    """
+    from app.workflows.object_permanence.gating import gate_registry
+
+    return gate_registry.stats(tenant_id)
+
+
 @app.post("/api/workflows/object-permanence")
 async def run_object_permanence_workflow(
         session: Session = Depends(get_session),
+        tenant_id: str = Form(...),
         current_frame: UploadFile = File(...),
         previous_frame: Optional[UploadFile] = File(None),
+        device_id: str = Form("default"),
+        run_id: Optional[str] = Form(None),
 ):
     """
     Runs the object permanence workflow.
@@ -79,29 +154,154 @@ async def run_object_permanence_workflow(
     - If only `current_frame` is provided, the workflow as currently implemented
       will not perform any analysis. For analysis to occur, both frames are required by the `check_frame_similarity` entrypoint.
 
-    The state of the workflow after execution is returned, excluding non-serializable
-    fields like images and the database session.
+    Whether the frames differ enough is decided by the adaptive similarity gate of
+    `device_id`, which tunes its threshold to the configured analysis budget. All
+    memories and checkpoints are scoped to the patient identified by `tenant_id`.
+
+    The frames are decoded once into the frame store and the workflow state only carries
+    their ids. Every node's output is checkpointed under `run_id` (generated when not
+    given). If a run with the same `run_id` already completed, its stored result is
+    returned without running the workflow again. If the run fails, the error response
+    contains the `run_id`, which can be passed to the resume endpoint. Checkpoints are
+    kept for `CHECKPOINT_TTL_HOURS`, except those of runs dropped by the gate, which
+    are deleted as soon as the run completes.
     """
-    current_frame_img = Image.open(io.BytesIO(await current_frame.read()))
-    current_frame_img.load()  # Force load the image data to prevent issues with lazy loading
-    previous_frame_img = None
-    if previous_frame:
-        previous_frame_img = Image.open(io.BytesIO(await previous_frame.read()))
-        previous_frame_img.load()  # Force load the image data
-
-    initial_state = State(current_frame=current_frame_img, previous_frame=previous_frame_img, db_session=session)
-
-    graph = create_compiled_state_graph()
-
-    # The graph.invoke will return the final state.
-    final_state = graph.invoke(initial_state)
-
-    # The state contains non-serializable fields like images and db session.
-    # We select the serializable fields to return.
-    serializable_state = {
-        key: value
-        for key, value in final_state.items()
-        if key not in ["current_frame", "previous_frame", "db_session"]
-    }
+    from app.workflows.object_permanence.frame_store import frame_store
+    from app.workflows.object_permanence.state import State
+    from app.workflows.object_permanence.workflow import get_compiled_state_graph
+
+    run_id = run_id or uuid.uuid4().hex
+    config = get_workflow_config(tenant_id, run_id, session)
+    graph = get_compiled_state_graph()
+
+    snapshot = await run_in_threadpool(graph.get_state, config)
+    if snapshot.values and not snapshot.next:
+        return {"run_id": run_id, **snapshot.values}
+
+    current_frame_id = previous_frame_id = None
+    try:
+        current_frame_id = await store_frame(current_frame)
+        if previous_frame:
+            previous_frame_id = await store_frame(previous_frame)
+
+        initial_state = State(
+            tenant_id=tenant_id,
+            current_frame_id=current_frame_id,
+            previous_frame_id=previous_frame_id,
+            device_id=device_id
+        )
+
+        try:
+            # The graph.invoke will return the final state. It runs in the thread pool so
+            # that concurrent runs overlap and their filter and embedding calls can be batched.
+            final_state = await run_in_threadpool(graph.invoke, initial_state, config)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail={"run_id": run_id, "error": f"Workflow failed: {e}"})
+    finally:
+        # The frames are only needed for the duration of the run, and are also released
+        # when a later upload turns out not to be an image.
+        frame_store.release(current_frame_id, previous_frame_id)
+
+    if not final_state.get("should_analyze"):
+        # Nothing was analyzed, so the run's checkpoints are not worth keeping.
+        await run_in_threadpool(delete_checkpoints, config["configurable"]["thread_id"])
+
+    return {"run_id": run_id, **final_state}
+
+
+@app.post("/api/workflows/object-permanence/{run_id}/resume")
+async def resume_object_permanence_workflow(
+        run_id: str,
+        session: Session = Depends(get_session),
+        tenant_id: str = Form(...),
+        current_frame: Optional[UploadFile] = File(None),
+        previous_frame: Optional[UploadFile] = File(None),
+):
+    """
+    Resumes a failed object permanence workflow run from its last completed node.
+
+    Nodes whose output was already checkpointed (e.g. both vision analyses) are not run
+    again. The frames are not checkpointed, so they only need to be uploaded again when
+    a node that reads them (similarity check or a vision analysis) has not completed yet.
+    If the run already completed, its stored result is returned. Runs are looked up
+    within `tenant_id` only, so a patient can never resume another patient's run.
+    """
+    from app.workflows.object_permanence.frame_store import frame_store
+    from app.workflows.object_permanence.workflow import get_compiled_state_graph
+
+    config = get_workflow_config(tenant_id, run_id, session)
+    graph = get_compiled_state_graph()
+
+    snapshot = await run_in_threadpool(graph.get_state, config)
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"No workflow run found with id: {run_id}")
+
+    if not snapshot.next:
+        return {"run_id": run_id, **snapshot.values}
+
+    # Re-register the frames under the ids recorded in the checkpointed state.
+    current_frame_id = snapshot.values.get("current_frame_id")
+    previous_frame_id = snapshot.values.get("previous_frame_id")
+    try:
+        if current_frame:
+            await store_frame(current_frame, current_frame_id)
+        if previous_frame and previous_frame_id:
+            await store_frame(previous_frame, previous_frame_id)
+
+        try:
+            # Invoking with no input continues from the last checkpoint.
+            final_state = await run_in_threadpool(graph.invoke, None, config)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail={"run_id": run_id, "error": f"Workflow failed: {e}"})
+    finally:
+        frame_store.release(current_frame_id, previous_frame_id)
+
+    return {"run_id": run_id, **final_state}
+
+
+@app.get("/api/tenants/{tenant_id}/memories/export")
+def export_memories(
+        tenant_id: str,
+        object_name: Optional[str] = None,
+        log_type: Optional[str] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        after_timestamp: Optional[float] = None,
+        after_id: Optional[int] = None,
+        include_embeddings: bool = False,
+        page_size: int = Query(1000, ge=1, le=10000),
+):
+    """
+    Streams the memory log of a tenant as NDJSON, one entry per line, ordered by
+    (`timestamp`, `id`).
+
+    Entries can be filtered by `object_name`, `log_type` and the
+    [`start_time`, `end_time`) range. Embeddings are only included when
+    `include_embeddings` is set. An interrupted export can be continued by passing
+    the `timestamp` and `id` of the last received entry as `after_timestamp` and
+    `after_id`.
+    """
+    from app.crud.object_permanence import iter_log_entries
+
+    if (after_timestamp is None) != (after_id is None):
+        raise HTTPException(status_code=422, detail="after_timestamp and after_id must be given together")
+    after = (after_timestamp, after_id) if after_id is not None else None
+
+    def generate_lines():
+        # The request scoped session is closed before the response is streamed, so
+        # the export uses its own session.
+        with Session(engine) as session:
+            for entry in iter_log_entries(
+                    session,
+                    tenant_id,
+                    object_name=object_name,
+                    log_type=log_type,
+                    start_time=start_time,
+                    end_time=end_time,
+                    after=after,
+                    include_embeddings=include_embeddings,
+                    page_size=page_size
+            ):
+                yield json.dumps(entry) + "\n"
 
-    return serializable_state
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
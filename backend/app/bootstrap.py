@@ -0,0 +1,33 @@
+from loguru import logger
+
+from app.core.checkpointer import setup_checkpointer
+from app.core.db import init_db, upgrade_db
+from app.core.embeddings import check_embedding_provider
+
+
+def main() -> None:
+    """
+    One-shot schema bootstrap, run once per deployment before the workers start
+    (`python -m app.bootstrap`) instead of on every worker boot.
+    """
+    # 1. Setup the database
+    logger.info("Setting up the database")
+    init_db()
+
+    # 2. Add the columns and indexes missing from existing tables
+    logger.info("Upgrading the database")
+    upgrade_db()
+
+    # 3. Setup the workflow checkpointer tables
+    logger.info("Setting up the workflow checkpointer")
+    setup_checkpointer()
+
+    # 4. Record the embedding provider, or fail fast if it does not match the database
+    logger.info("Checking the embedding provider")
+    check_embedding_provider()
+
+    logger.info("Bootstrap complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects items submitted by concurrent workflow runs and processes them together.
+
+    A collector thread waits for the first pending item, then keeps collecting until
+    `max_batch_size` items are pending or `max_wait_ms` have passed, and hands the
+    batch to `fn` on a dispatch pool, so that slow batches do not hold back the next
+    one. `fn` receives a list of items and must return one result per item, in order.
+    Each caller blocks until the results of its own items are available.
+
+    If `key` is given, only items with the same key are batched together, e.g. so that
+    the data of different tenants never shares a model call. Each key collects its own
+    batch with its own deadline.
+
+    The threads are started on first use and restarted after a fork, so a batcher can
+    be created at import time in a pre-forking server.
+    """
+
+    def __init__(self, fn: Callable[[list[T]], list[R]], max_batch_size: int, max_wait_ms: float, name: str,
+                 key: Optional[Callable[[T], Hashable]] = None):
+        self.fn = fn
+        self.key = key
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._queue: queue.SimpleQueue[tuple[T, Future]] = queue.SimpleQueue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            logger.debug(f"Starting micro-batcher: {self.name}")
+            self._queue = queue.SimpleQueue()
+            self._executor = ThreadPoolExecutor(thread_name_prefix=f"{self.name}-dispatch")
+            threading.Thread(target=self._collect, name=f"{self.name}-collect", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _collect(self) -> None:
+        # The pending batches by key, each with the deadline of its first item.
+        pending: dict[Hashable, tuple[float, list[tuple[T, Future]]]] = {}
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(min(deadline for deadline, _ in pending.values()) - time.monotonic(), 0)
+
+            try:
+                item, future = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            else:
+                key = self.key(item) if self.key else None
+                _, batch = pending.setdefault(key, (time.monotonic() + self.max_wait, []))
+                batch.append((item, future))
+                if len(batch) >= self.max_batch_size:
+                    self._flush(pending.pop(key)[1])
+
+            now = time.monotonic()
+            for key, (deadline, batch) in list(pending.items()):
+                if deadline <= now:
+                    self._flush(pending.pop(key)[1])
+
+    def _flush(self, batch: list[tuple[T, Future]]) -> None:
+        logger.debug(f"Dispatching batch of {len(batch)} items from micro-batcher: {self.name}")
+        self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: list[tuple[T, Future]]) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = self.fn(items)
+            if len(results) != len(items):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Micro-batcher {self.name} failed to process a batch: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def submit_many(self, items: list[T]) -> list[R]:
+        """
+        Submits several items and waits for their results.
+
+        :param items: The items to process.
+        :type items: list[T]
+        :return: The results of the items, in order.
+        :rtype: list[R]
+        """
+        self._ensure_started()
+        futures = []
+        for item in items:
+            future = Future()
+            self._queue.put((item, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def submit(self, item: T) -> R:
+        """
+        Submits a single item and waits for its result.
+
+        :param item: The item to process.
+        :type item: T
+        :return: The result of the item.
+        :rtype: R
+        """
+        return self.submit_many([item])[0]
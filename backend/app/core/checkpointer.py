@@ -0,0 +1,84 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+from app.core.config import Config
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+
+@lru_cache
+def get_checkpointer() -> "PostgresSaver":
+    """
+    Returns the workflow checkpointer. Its connection pool is created closed, so the
+    checkpointer can be built before a pre-forking server forks; each worker opens the
+    pool in its lifespan.
+
+    :return: The Postgres checkpoint saver.
+    :rtype: PostgresSaver
+    """
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    pool = ConnectionPool(
+        Config.POSTGRES_CHECKPOINT_URL,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    return PostgresSaver(pool)
+
+
+def setup_checkpointer() -> None:
+    # Create the checkpoint tables using a one-off connection
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    with PostgresSaver.from_conn_string(Config.POSTGRES_CHECKPOINT_URL) as checkpointer:
+        checkpointer.setup()
+
+
+def open_checkpointer() -> None:
+    get_checkpointer().conn.open()
+
+
+def close_checkpointer() -> None:
+    get_checkpointer().conn.close()
+
+
+def delete_checkpoints(thread_id: str) -> None:
+    """
+    Deletes every checkpoint of a workflow run.
+
+    :param thread_id: The checkpoint thread id of the run.
+    :type thread_id: str
+    """
+    get_checkpointer().delete_thread(thread_id)
+
+
+def prune_checkpoints(max_age_hours: float) -> int:
+    """
+    Deletes the checkpoints of every workflow run whose latest checkpoint is older than
+    `max_age_hours`, so that the checkpoint tables do not grow with camera traffic.
+    Completed runs are kept until then so that retries with the same run id get the
+    stored result, and failed runs so that they can be resumed.
+
+    :param max_age_hours: The age after which the checkpoints of a run are deleted.
+    :type max_age_hours: float
+    :return: The number of runs whose checkpoints were deleted.
+    :rtype: int
+    """
+    checkpointer = get_checkpointer()
+    with checkpointer.conn.connection() as connection:
+        rows = connection.execute(
+            "SELECT thread_id FROM checkpoints GROUP BY thread_id "
+            "HAVING max((checkpoint->>'ts')::timestamptz) < now() - %s * interval '1 hour'",
+            (max_age_hours,)
+        ).fetchall()
+
+    for row in rows:
+        checkpointer.delete_thread(row["thread_id"])
+
+    logger.info(f"Pruned the checkpoints of {len(rows)} workflow runs older than {max_age_hours} hours")
+    return len(rows)
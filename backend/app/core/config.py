@@ -5,6 +5,7 @@ from app.core.constants import Constants
 
 class Config:
     DEBUG: bool = os.getenv("DEBUG", Constants.DEBUG) == "true"
+    WARM_UP: bool = os.getenv("WARM_UP", Constants.WARM_UP) == "true"
 
     POSTGRES_HOST: str = os.getenv("POSTGRES_HOST", Constants.DEFAULT_POSTGRES_HOST)
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", Constants.DEFAULT_POSTGRES_PORT)
@@ -15,6 +16,8 @@ class Config:
     POSTGRES_DB: str = os.getenv("POSTGRES_LEADS_DB", Constants.DEFAULT_POSTGRES_DB)
 
     POSTGRES_URL: str = f"postgresql+psycopg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    POSTGRES_CHECKPOINT_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    CHECKPOINT_TTL_HOURS: float = float(os.getenv("CHECKPOINT_TTL_HOURS", Constants.DEFAULT_CHECKPOINT_TTL_HOURS))
 
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
     GEMINI_PROVIDER: str = os.getenv("GEMINI_PROVIDER")
@@ -22,3 +25,19 @@ class Config:
     GEMINI_SMART_MODEL: str = os.getenv("GEMINI_SMART_MODEL")
     GEMINI_VISION_MODEL: str = os.getenv("GEMINI_VISION_MODEL")
     GEMINI_EMBEDDING_MODEL: str = os.getenv("GEMINI_EMBEDDING_MODEL")
+
+    GATE_THRESHOLD: float = float(os.getenv("GATE_THRESHOLD", Constants.DEFAULT_GATE_THRESHOLD))
+    GATE_MIN_THRESHOLD: float = float(os.getenv("GATE_MIN_THRESHOLD", Constants.DEFAULT_GATE_MIN_THRESHOLD))
+    GATE_MAX_THRESHOLD: float = float(os.getenv("GATE_MAX_THRESHOLD", Constants.DEFAULT_GATE_MAX_THRESHOLD))
+    GATE_TARGET_CALLS_PER_HOUR: float = float(
+        os.getenv("GATE_TARGET_CALLS_PER_HOUR", Constants.DEFAULT_GATE_TARGET_CALLS_PER_HOUR)
+    )
+    GATE_WINDOW_SIZE: int = int(os.getenv("GATE_WINDOW_SIZE", Constants.DEFAULT_GATE_WINDOW_SIZE))
+    GATE_MIN_SAMPLES: int = int(os.getenv("GATE_MIN_SAMPLES", Constants.DEFAULT_GATE_MIN_SAMPLES))
+
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", Constants.DEFAULT_EMBEDDING_PROVIDER)
+    EMBEDDING_DIMENSION: int = int(os.getenv("EMBEDDING_DIMENSION", Constants.DEFAULT_EMBEDDING_DIMENSION))
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", Constants.DEFAULT_EMBEDDING_BATCH_SIZE))
+
+    BATCH_MAX_WAIT_MS: float = float(os.getenv("BATCH_MAX_WAIT_MS", Constants.DEFAULT_BATCH_MAX_WAIT_MS))
+    FILTER_BATCH_SIZE: int = int(os.getenv("FILTER_BATCH_SIZE", Constants.DEFAULT_FILTER_BATCH_SIZE))
@@ -1,8 +1,26 @@
 class Constants:
     DEBUG = "true"
+    WARM_UP = "false"
 
     DEFAULT_POSTGRES_HOST: str = "localhost"
     DEFAULT_POSTGRES_PORT: str = "5432"
     DEFAULT_POSTGRES_USER: str = "user"
     DEFAULT_POSTGRES_PASSWORD: str = "password"
     DEFAULT_POSTGRES_DB: str = "db"
+
+    DEFAULT_CHECKPOINT_TTL_HOURS: float = 24.0
+    CHECKPOINT_PRUNE_INTERVAL_SECONDS: float = 3600.0
+
+    DEFAULT_GATE_THRESHOLD: float = 0.85
+    DEFAULT_GATE_MIN_THRESHOLD: float = 0.5
+    DEFAULT_GATE_MAX_THRESHOLD: float = 0.95
+    DEFAULT_GATE_TARGET_CALLS_PER_HOUR: float = 60.0
+    DEFAULT_GATE_WINDOW_SIZE: int = 500
+    DEFAULT_GATE_MIN_SAMPLES: int = 20
+
+    DEFAULT_EMBEDDING_PROVIDER: str = "gemini"
+    DEFAULT_EMBEDDING_DIMENSION: int = 3072
+    DEFAULT_EMBEDDING_BATCH_SIZE: int = 100
+
+    DEFAULT_BATCH_MAX_WAIT_MS: float = 5.0
+    DEFAULT_FILTER_BATCH_SIZE: int = 8
@@ -1,5 +1,8 @@
+import hashlib
 from typing import Generator
 
+from loguru import logger
+from sqlalchemy import literal
 from sqlmodel import create_engine, Session, SQLModel, text
 
 from app.core.config import Config
@@ -8,6 +11,9 @@ engine = create_engine(Config.POSTGRES_URL)
 
 
 def init_db() -> None:
+    # Register the tables with SQLModel.metadata
+    from app.models import object_permanence, gating, embeddings  # noqa: F401
+
     # 1. Enable the extension using a raw connection
     with Session(engine) as session:
         session.exec(text("CREATE EXTENSION IF NOT EXISTS vector"))
@@ -17,6 +23,82 @@ def init_db() -> None:
     SQLModel.metadata.create_all(engine)
 
 
+def upgrade_db() -> None:
+    """
+    Brings the tables of an existing deployment up to date. `create_all` skips tables
+    that already exist, so columns and indexes added to existing models are created
+    here. Every statement is idempotent. Memories logged before tenants were
+    introduced are assigned to the `default` tenant.
+    """
+    statements = [
+        "ALTER TABLE objectpermanence ADD COLUMN IF NOT EXISTS tenant_id VARCHAR NOT NULL DEFAULT 'default'",
+        "ALTER TABLE objectpermanence ALTER COLUMN tenant_id DROP DEFAULT",
+        "ALTER TABLE objectpermanence ADD COLUMN IF NOT EXISTS device_id VARCHAR",
+        "ALTER TABLE objectpermanence ADD COLUMN IF NOT EXISTS run_id VARCHAR",
+        "CREATE INDEX IF NOT EXISTS ix_objectpermanence_run_id ON objectpermanence (run_id)",
+        "CREATE INDEX IF NOT EXISTS ix_objectpermanence_tenant_object_timestamp "
+        "ON objectpermanence (tenant_id, object_name, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_objectpermanence_tenant_timestamp_id "
+        "ON objectpermanence (tenant_id, timestamp, id)",
+    ]
+
+    with Session(engine) as session:
+        for statement in statements:
+            session.exec(text(statement))
+        session.commit()
+
+
+def create_tenant_vector_index(tenant_id: str) -> str:
+    """
+    Creates a partial HNSW index over the embeddings of a single tenant.
+
+    Tenant scoped similarity searches on small tenants are served by the composite
+    (tenant_id, ...) indexes. Large tenants get their own partial vector index, so
+    that nearest neighbour searches never traverse other patients' vectors. The
+    3072-dimension embeddings exceed the HNSW limit of `vector`, so the index is built
+    on a `halfvec` cast; queries must use `embedding::halfvec(3072)` with the cosine
+    distance operator and filter on `tenant_id` to use it.
+
+    A valid index is left as is. An invalid index, left behind by a failed earlier
+    build, is dropped and built again.
+
+    :param tenant_id: The id of the patient to index.
+    :type tenant_id: str
+    :return: The name of the index.
+    :rtype: str
+    """
+    index_name = f"ix_objectpermanence_embedding_{hashlib.sha1(tenant_id.encode()).hexdigest()[:16]}"
+    # DDL cannot take bound parameters, so the tenant id is rendered as an escaped literal.
+    tenant_literal = literal(tenant_id).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        is_valid = connection.execute(
+            text(
+                "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :index_name"
+            ),
+            {"index_name": index_name}
+        ).scalar()
+
+        if is_valid:
+            logger.info(f"Vector index {index_name} of tenant {tenant_id} already exists")
+            return index_name
+
+        if is_valid is not None:
+            logger.warning(f"Vector index {index_name} of tenant {tenant_id} is invalid, rebuilding it")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+
+        logger.info(f"Building vector index {index_name} of tenant {tenant_id}")
+        connection.execute(text(
+            f"CREATE INDEX CONCURRENTLY {index_name} ON objectpermanence "
+            f"USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops) "
+            f"WHERE tenant_id = {tenant_literal}"
+        ))
+
+    return index_name
+
+
 def get_session() -> Generator[Session]:
     with Session(engine) as session:
         yield session
@@ -0,0 +1,228 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from loguru import logger
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, text
+
+from app.core.batching import MicroBatcher
+from app.core.config import Config
+from app.core.db import engine
+from app.models.embeddings import EmbeddingSettings
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns text into fixed size vectors for the memory log.
+    """
+
+    def __init__(self, dimension: int, batch_size: int):
+        self.dimension = dimension
+        self.batch_size = batch_size
+
+    @classmethod
+    @abstractmethod
+    def model_name(cls) -> str:
+        """
+        Returns the name of the model the provider embeds with. Providers with different
+        model names produce incompatible vectors.
+        """
+        ...
+
+    @abstractmethod
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embeds several texts, sending them to the backend in batches of `batch_size`.
+
+        :param texts: The texts to embed.
+        :type texts: list[str]
+        :return: One embedding per input text, in order.
+        :rtype: list[list[float]]
+        """
+        logger.debug(f"Embedding {len(texts)} texts with {type(self).__name__}")
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors += self._embed_batch(texts[start:start + self.batch_size])
+        return vectors
+
+    def embed_query(self, text: str) -> list[float]:
+        """
+        Embeds a single search query. Providers that embed queries differently from
+        the documents they are matched against override this.
+
+        :param text: The text to embed.
+        :type text: str
+        :return: The embedding of the text.
+        :rtype: list[float]
+        """
+        return self.embed_documents([text])[0]
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds text with the configured Gemini embedding model.
+    """
+
+    def __init__(self, dimension: int, batch_size: int):
+        super().__init__(dimension, batch_size)
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.embeddings = GoogleGenerativeAIEmbeddings(
+            model=Config.GEMINI_EMBEDDING_MODEL,
+            google_api_key=Config.GEMINI_API_KEY
+        )
+
+    @classmethod
+    def model_name(cls) -> str:
+        return Config.GEMINI_EMBEDDING_MODEL
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts, output_dimensionality=self.dimension)
+
+    def embed_query(self, text: str) -> list[float]:
+        # Queries are embedded with the `RETRIEVAL_QUERY` task type, documents with
+        # `RETRIEVAL_DOCUMENT`.
+        return self.embeddings.embed_query(text, output_dimensionality=self.dimension)
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeds text in-process on the CPU with a scikit-learn `HashingVectorizer` over
+    character n-grams. It needs no model download or network access, and being
+    stateless it produces the same vectors in every process. The vectors capture
+    lexical rather than semantic similarity, which suits the short, templated
+    memory sentences, but they are not comparable to Gemini vectors: a database must
+    stick to one provider.
+    """
+
+    def __init__(self, dimension: int, batch_size: int):
+        super().__init__(dimension, batch_size)
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = HashingVectorizer(
+            n_features=dimension,
+            analyzer="char_wb",
+            ngram_range=(2, 4),
+            alternate_sign=False,
+            norm="l2"
+        )
+
+    @classmethod
+    def model_name(cls) -> str:
+        return "hashing-char_wb-2-4"
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        return self.vectorizer.transform(texts).toarray().tolist()
+
+
+EMBEDDING_PROVIDERS: dict[str, type[EmbeddingProvider]] = {
+    "gemini": GeminiEmbeddingProvider,
+    "local": LocalEmbeddingProvider,
+}
+
+
+def get_embedding_provider_class() -> type[EmbeddingProvider]:
+    """
+    Returns the embedding provider class selected by `Config.EMBEDDING_PROVIDER`.
+
+    :raises ValueError: If the provider is unknown.
+    :return: The configured embedding provider class.
+    :rtype: type[EmbeddingProvider]
+    """
+    provider_class = EMBEDDING_PROVIDERS.get(Config.EMBEDDING_PROVIDER)
+    if provider_class is None:
+        raise ValueError(
+            f"Unknown embedding provider: {Config.EMBEDDING_PROVIDER}. "
+            f"Available providers: {', '.join(EMBEDDING_PROVIDERS)}"
+        )
+    return provider_class
+
+
+def check_embedding_provider() -> None:
+    """
+    Ensures that the configured embedding provider matches the database.
+
+    The dimension is compared with the `embedding` column as it exists in the
+    database. The provider, model and dimension are recorded on first use, and any
+    later configuration that differs is refused: vectors of different providers or
+    models are not comparable, so they must never be mixed in one memory log. If the
+    memory log already has entries when nothing is recorded yet, they predate the
+    pluggable providers and were embedded with Gemini, so Gemini is recorded.
+
+    :raises ValueError: If the provider is unknown or does not match the database.
+    """
+    provider_class = get_embedding_provider_class()
+    model = provider_class.model_name()
+
+    with Session(engine) as session:
+        # pgvector stores the dimension of a `vector(n)` column as its type modifier.
+        column_dimension = session.exec(text(
+            "SELECT atttypmod FROM pg_attribute "
+            "WHERE attrelid = 'objectpermanence'::regclass AND attname = 'embedding'"
+        )).scalar()
+        if column_dimension != Config.EMBEDDING_DIMENSION:
+            raise ValueError(
+                f"The embedding provider produces {Config.EMBEDDING_DIMENSION}-dimension vectors, "
+                f"but the embedding column stores {column_dimension}-dimension vectors"
+            )
+
+        settings = session.get(EmbeddingSettings, 1)
+        if settings is None:
+            has_entries = session.exec(text("SELECT EXISTS (SELECT 1 FROM objectpermanence)")).scalar()
+            if has_entries:
+                logger.warning("The memory log has entries but no recorded embedding provider, recording gemini")
+                recorded = ("gemini", GeminiEmbeddingProvider.model_name(), column_dimension)
+            else:
+                recorded = (Config.EMBEDDING_PROVIDER, model, Config.EMBEDDING_DIMENSION)
+
+            session.exec(
+                insert(EmbeddingSettings)
+                .values(id=1, provider=recorded[0], model=recorded[1], dimension=recorded[2])
+                .on_conflict_do_nothing()
+            )
+            session.commit()
+            settings = session.get(EmbeddingSettings, 1)
+
+    if (settings.provider, settings.model, settings.dimension) != (
+            Config.EMBEDDING_PROVIDER, model, Config.EMBEDDING_DIMENSION):
+        raise ValueError(
+            f"The memory log was embedded with provider {settings.provider}, model {settings.model} "
+            f"({settings.dimension} dimensions), but the configured provider is {Config.EMBEDDING_PROVIDER}, "
+            f"model {model} ({Config.EMBEDDING_DIMENSION} dimensions)"
+        )
+
+
+@lru_cache
+def get_embedding_provider() -> EmbeddingProvider:
+    """
+    Returns the embedding provider selected by `Config.EMBEDDING_PROVIDER`, created
+    once. It is checked against the database by :func:`check_embedding_provider` at
+    bootstrap and when a worker starts.
+
+    :raises ValueError: If the provider is unknown.
+    :return: The configured embedding provider.
+    :rtype: EmbeddingProvider
+    """
+    provider_class = get_embedding_provider_class()
+    logger.info(f"Using embedding provider: {Config.EMBEDDING_PROVIDER}")
+    return provider_class(Config.EMBEDDING_DIMENSION, Config.EMBEDDING_BATCH_SIZE)
+
+
+@lru_cache
+def get_embedding_batcher() -> MicroBatcher[str, list[float]]:
+    """
+    Returns a micro-batcher that merges the texts embedded by concurrent workflow runs
+    into shared `embed_documents` calls of the configured provider.
+
+    :return: The embedding micro-batcher.
+    :rtype: MicroBatcher[str, list[float]]
+    """
+    return MicroBatcher(
+        get_embedding_provider().embed_documents,
+        max_batch_size=Config.EMBEDDING_BATCH_SIZE,
+        max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+        name="embeddings"
+    )
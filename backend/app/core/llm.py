@@ -0,0 +1,91 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, TypeVar
+
+from loguru import logger
+from pydantic import BaseModel
+
+from app.core.config import Config
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+@lru_cache
+def get_chat_model(model: str) -> "BaseChatModel":
+    """
+    Returns the chat model with the given name, created once per process and shared
+    by all workflow runs.
+
+    :param model: The name of the model, e.g. `Config.GEMINI_VISION_MODEL`.
+    :type model: str
+    :return: The chat model.
+    :rtype: BaseChatModel
+    """
+    from langchain.chat_models import init_chat_model
+
+    logger.debug(f"Initializing chat model: {model}")
+    return init_chat_model(
+        model=model,
+        model_provider=Config.GEMINI_PROVIDER,
+        api_key=Config.GEMINI_API_KEY
+    )
+
+
+def invoke_structured_raw(model: str, response_format: type[ResponseT], system_prompt: str,
+                          content: list[dict]) -> dict:
+    """
+    Calls the model once in its native JSON-schema mode and validates the response
+    into `response_format`. Unlike an agent with a `response_format`, there is no tool
+    calling loop, so it is always a single round-trip.
+
+    :param model: The name of the model.
+    :type model: str
+    :param response_format: The Pydantic model the response is validated into.
+    :type response_format: type[ResponseT]
+    :param system_prompt: The system prompt.
+    :type system_prompt: str
+    :param content: The content blocks of the human message.
+    :type content: list[dict]
+    :return: A dictionary with the validated response under `parsed` and the raw
+        model message, including its `usage_metadata`, under `raw`.
+    :rtype: dict
+    """
+    from langchain_core.messages import SystemMessage, HumanMessage
+
+    structured_model = get_chat_model(model).with_structured_output(
+        response_format,
+        method="json_schema",
+        include_raw=True
+    )
+
+    result = structured_model.invoke([
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=content)
+    ])
+    if result["parsing_error"] is not None:
+        raise ValueError(f"Model response is not a valid {response_format.__name__}: {result['parsing_error']}")
+
+    logger.debug(f"Token usage of {response_format.__name__} call: {result['raw'].usage_metadata}")
+    return result
+
+
+def invoke_structured(model: str, response_format: type[ResponseT], system_prompt: str,
+                      content: list[dict]) -> ResponseT:
+    """
+    Calls the model once in its native JSON-schema mode and returns the response
+    validated into `response_format`. See :func:`invoke_structured_raw`.
+
+    :param model: The name of the model.
+    :type model: str
+    :param response_format: The Pydantic model the response is validated into.
+    :type response_format: type[ResponseT]
+    :param system_prompt: The system prompt.
+    :type system_prompt: str
+    :param content: The content blocks of the human message.
+    :type content: list[dict]
+    :return: The validated response.
+    :rtype: ResponseT
+    """
+    return invoke_structured_raw(model, response_format, system_prompt, content)["parsed"]
@@ -0,0 +1,26 @@
+from loguru import logger
+
+
+def warm_up() -> None:
+    """
+    Loads everything the workflow needs ahead of the first request: the LangChain,
+    LangGraph, OpenCV and scikit-image imports, the compiled graph, the chat models
+    and the embedding provider.
+
+    Meant to run in the master process of a pre-forking server (e.g. gunicorn with
+    `--preload`), so that the work is done once and shared by every forked worker.
+    Nothing created here may hold open connections or threads across the fork.
+    """
+    logger.info("Warming up the object permanence workflow")
+
+    from app.core.config import Config
+    from app.core.embeddings import get_embedding_provider
+    from app.core.llm import get_chat_model
+    from app.workflows.object_permanence.workflow import get_compiled_state_graph
+
+    get_compiled_state_graph()
+    get_chat_model(Config.GEMINI_FAST_MODEL)
+    get_chat_model(Config.GEMINI_VISION_MODEL)
+    get_embedding_provider()
+
+    logger.info("Warm-up complete")
@@ -1,25 +1,35 @@
+from typing import Optional, Iterator
+
 from loguru import logger
-from sqlmodel import Session
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
 
 from app.models.object_permanence import ObjectPermanence
 
 
 def create_log_entry(
         db: Session,
+        tenant_id: str,
         content: str,
         embedding: list[float],
         timestamp: float,
         object_name: str,
-        log_type: str
+        log_type: str,
+        device_id: Optional[str] = None,
+        run_id: Optional[str] = None,
+        commit: bool = True
 ):
     """
     Creates and stores a log entry in the database. The log entry includes content,
     embedding data, a timestamp, the associated object name, and its type. The
     entry is committed to the database and the changes are refreshed to ensure the
-    latest state of the log entry is returned.
+    latest state of the log entry is returned. When `commit` is False the entry is
+    only added to the session, so that several entries can be committed together.
 
     :param db: The database session used to perform the operation.
     :type db: Session
+    :param tenant_id: The id of the patient the log entry belongs to.
+    :type tenant_id: str
     :param content: The textual information of the log entry.
     :type content: str
     :param embedding: A list of floating-point numbers representing the embedding
@@ -32,22 +42,35 @@ def create_log_entry(
     :type object_name: str
     :param log_type: The type or category of the log entry.
     :type log_type: str
+    :param device_id: The id of the device that captured the log entry.
+    :type device_id: Optional[str]
+    :param run_id: The id of the workflow run that produced the log entry.
+    :type run_id: Optional[str]
+    :param commit: Whether to commit the session after adding the entry.
+    :type commit: bool
     :return: The newly created log entry after being added to the database.
     :rtype: ObjectPermanence
     """
-    logger.info(f"Creating log entry for object: {object_name} of type: {log_type}")
+    logger.info(f"Creating log entry for tenant: {tenant_id}, object: {object_name} of type: {log_type}")
     logger.debug(f"Log entry content: {content}")
     logger.debug(f"Log entry timestamp: {timestamp}")
     db_log = ObjectPermanence(
+        tenant_id=tenant_id,
+        device_id=device_id,
         content=content,
         embedding=embedding,
         timestamp=timestamp,
         object_name=object_name,
-        log_type=log_type
+        log_type=log_type,
+        run_id=run_id
     )
     logger.debug("Log entry object created: {db_log}", db_log=db_log)
     db.add(db_log)
     logger.debug("Log entry added to the database session.")
+    if not commit:
+        logger.debug("Deferring commit to the caller.")
+        return db_log
+
     db.commit()
     logger.debug("Database session committed.")
     db.refresh(db_log)
@@ -55,3 +78,114 @@ def create_log_entry(
 
     logger.info(f"Successfully created log entry for object: {object_name}")
     return db_log
+
+
+def has_log_entries_for_run(db: Session, tenant_id: str, run_id: str) -> bool:
+    """
+    Checks whether any log entries were already stored for the given workflow run.
+    This makes saving a run's results idempotent when the run is resumed.
+
+    :param db: The database session used to perform the operation.
+    :type db: Session
+    :param tenant_id: The id of the patient the run belongs to.
+    :type tenant_id: str
+    :param run_id: The id of the workflow run.
+    :type run_id: str
+    :return: True if at least one log entry exists for the run; False otherwise.
+    :rtype: bool
+    """
+    logger.debug(f"Checking for existing log entries of tenant: {tenant_id}, run: {run_id}")
+    statement = (
+        select(ObjectPermanence.id)
+        .where(ObjectPermanence.tenant_id == tenant_id, ObjectPermanence.run_id == run_id)
+        .limit(1)
+    )
+    result = db.exec(statement).first()
+    return result is not None
+
+
+def iter_log_entries(
+        db: Session,
+        tenant_id: str,
+        object_name: Optional[str] = None,
+        log_type: Optional[str] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        after: Optional[tuple[float, int]] = None,
+        include_embeddings: bool = False,
+        page_size: int = 1000
+) -> Iterator[dict]:
+    """
+    Iterates over the log entries of a tenant in (timestamp, id) order, using keyset
+    pagination so that every page is an index range scan on
+    (tenant_id, timestamp, id), however deep into the log it is. Each page is read
+    through a server-side cursor, so memory use does not depend on the result size.
+
+    :param db: The database session used to perform the operation.
+    :type db: Session
+    :param tenant_id: The id of the patient whose log entries are read.
+    :type tenant_id: str
+    :param object_name: Only return entries of this object, if given.
+    :type object_name: Optional[str]
+    :param log_type: Only return entries of this type, if given.
+    :type log_type: Optional[str]
+    :param start_time: Only return entries at or after this timestamp, if given.
+    :type start_time: Optional[float]
+    :param end_time: Only return entries before this timestamp, if given.
+    :type end_time: Optional[float]
+    :param after: Only return entries after this (timestamp, id) position, e.g. the
+        last entry of an interrupted export.
+    :type after: Optional[tuple[float, int]]
+    :param include_embeddings: Whether to include the embedding of each entry.
+    :type include_embeddings: bool
+    :param page_size: The number of entries read per page.
+    :type page_size: int
+    :return: An iterator over the log entries as dictionaries.
+    :rtype: Iterator[dict]
+    """
+    logger.info(f"Iterating over log entries of tenant: {tenant_id}")
+    columns = [
+        ObjectPermanence.id,
+        ObjectPermanence.tenant_id,
+        ObjectPermanence.device_id,
+        ObjectPermanence.content,
+        ObjectPermanence.timestamp,
+        ObjectPermanence.object_name,
+        ObjectPermanence.log_type,
+        ObjectPermanence.run_id,
+    ]
+    if include_embeddings:
+        columns.append(ObjectPermanence.embedding)
+
+    statement = select(*columns).where(ObjectPermanence.tenant_id == tenant_id)
+    if object_name is not None:
+        statement = statement.where(ObjectPermanence.object_name == object_name)
+    if log_type is not None:
+        statement = statement.where(ObjectPermanence.log_type == log_type)
+    if start_time is not None:
+        statement = statement.where(ObjectPermanence.timestamp >= start_time)
+    if end_time is not None:
+        statement = statement.where(ObjectPermanence.timestamp < end_time)
+    statement = statement.order_by(ObjectPermanence.timestamp, ObjectPermanence.id)
+
+    while True:
+        page_statement = statement
+        if after is not None:
+            page_statement = page_statement.where(
+                tuple_(ObjectPermanence.timestamp, ObjectPermanence.id) > tuple_(*after)
+            )
+        page_statement = page_statement.limit(page_size).execution_options(yield_per=page_size)
+
+        logger.debug(f"Reading log entries page after: {after}")
+        count = 0
+        for row in db.exec(page_statement):
+            entry = row._asdict()
+            if include_embeddings:
+                entry["embedding"] = [float(value) for value in entry["embedding"]]
+            after = (entry["timestamp"], entry["id"])
+            count += 1
+            yield entry
+
+        if count < page_size:
+            logger.debug("Reached the end of the log entries")
+            return
@@ -0,0 +1,10 @@
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+class EmbeddingSettings(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True, description="The primary key of the table.")
+    provider: str = Field(description="The embedding provider the memory log was embedded with.")
+    model: str = Field(description="The embedding model of the provider.")
+    dimension: int = Field(description="The dimension of the embeddings.")
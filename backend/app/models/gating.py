@@ -0,0 +1,27 @@
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import SQLModel, Field, Column
+
+
+class GateState(SQLModel, table=True):
+    tenant_id: str = Field(primary_key=True, description="The patient the device belongs to.")
+    device_id: str = Field(primary_key=True, description="The device the gate belongs to.")
+    threshold: float = Field(description="The current SSIM threshold of the device.")
+    frames_seen: int = Field(default=0, description="The total number of frame pairs gated.")
+    analyses_triggered: int = Field(default=0, description="The total number of frame pairs sent for analysis.")
+    scores: list[list[float]] = Field(
+        default_factory=list,
+        sa_column=Column(JSONB, nullable=False),
+        description="The window of recent (timestamp, SSIM score) pairs."
+    )
+    analyses: list[float] = Field(
+        default_factory=list,
+        sa_column=Column(JSONB, nullable=False),
+        description="The timestamps of the analyses of the last hour."
+    )
+    last_decision: Optional[dict] = Field(
+        default=None,
+        sa_column=Column(JSONB),
+        description="The most recent gating decision."
+    )
@@ -1,13 +1,22 @@
 from typing import Optional
 
 from pgvector.sqlalchemy import Vector
-from sqlmodel import SQLModel, Field, Column
+from sqlmodel import SQLModel, Field, Column, Index
 
 
 class ObjectPermanence(SQLModel, table=True):
+    __table_args__ = (
+        # Every query is scoped to a single tenant, so the tenant id leads each index.
+        Index("ix_objectpermanence_tenant_object_timestamp", "tenant_id", "object_name", "timestamp"),
+        Index("ix_objectpermanence_tenant_timestamp_id", "tenant_id", "timestamp", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True, description="The primary key of the table.")
+    tenant_id: str = Field(description="The patient the log entry belongs to.")
+    device_id: Optional[str] = Field(default=None, description="The device that captured the log entry.")
     content: str = Field(description="The natural language description of the log entry.")
     embedding: list[float] = Field(sa_column=Column(Vector(3072)), description="The embedding of the log entry.")
-    timestamp: float = Field(index=True, description="The timestamp of the log entry.")
-    object_name: str = Field(index=True, description="The name of the object to log.")
+    timestamp: float = Field(description="The timestamp of the log entry.")
+    object_name: str = Field(description="The name of the object to log.")
     log_type: str = Field(description="The type of log entry: state | action")
+    run_id: Optional[str] = Field(default=None, index=True, description="The workflow run that created the log entry.")
@@ -0,0 +1,25 @@
+import argparse
+
+from loguru import logger
+
+from app.core.db import create_tenant_vector_index
+
+
+def main() -> None:
+    """
+    Admin command that builds the partial vector index of one or more tenants
+    (`python -m app.tenant_index <tenant_id> ...`). Intended for patients whose memory
+    log has grown large enough that tenant filtered scans become slow. Running it
+    again is safe: valid indexes are kept and invalid ones are rebuilt.
+    """
+    parser = argparse.ArgumentParser(description="Builds the partial vector index of one or more tenants.")
+    parser.add_argument("tenant_ids", nargs="+", help="The ids of the patients to index.")
+    args = parser.parse_args()
+
+    for tenant_id in args.tenant_ids:
+        index_name = create_tenant_vector_index(tenant_id)
+        logger.info(f"Vector index of tenant {tenant_id} is ready: {index_name}")
+
+
+if __name__ == "__main__":
+    main()
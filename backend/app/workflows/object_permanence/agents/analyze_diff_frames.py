@@ -1,14 +1,60 @@
-import base64
-import io
-
-from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import SystemMessage, HumanMessage, TextContentBlock, ImageContentBlock
 from loguru import logger
 
 from app.core.config import Config
+from app.core.llm import invoke_structured
+from app.workflows.object_permanence.frame_store import frame_store, encode_png_base64
 from app.workflows.object_permanence.prompts import Prompts
 from app.workflows.object_permanence.state import State, DiffAnalysis
+from app.workflows.object_permanence.tools.diff_regions import find_change_regions, crop_region
+
+
+def image_block(image_data: str) -> dict:
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/png;base64,{image_data}"
+        }
+    }
+
+
+def build_image_blocks(state: State) -> list[dict]:
+    """
+    Builds the image content blocks sent to the diff model. When the change between
+    the frames is localized, only padded crops of the changed regions are sent, one
+    (previous, current) pair per region. Otherwise both full frames are sent.
+
+    :param state: The state object containing the frame store handles.
+    :type state: State
+    :return: The content blocks describing the images to compare.
+    :rtype: list[dict]
+    """
+    regions = find_change_regions(
+        frame_store.get_grayscale(state.previous_frame_id),
+        frame_store.get_grayscale(state.current_frame_id)
+    )
+
+    if regions is None:
+        logger.debug("Sending full frames for diff analysis")
+        prev_image_data = frame_store.get_png_base64(state.previous_frame_id)
+        curr_image_data = frame_store.get_png_base64(state.current_frame_id)
+
+        logger.debug(f"Previous image data length: {len(prev_image_data)}")
+        logger.debug(f"Current image data length: {len(curr_image_data)}")
+        return [image_block(prev_image_data), image_block(curr_image_data)]
+
+    logger.debug(f"Sending {len(regions)} changed regions for diff analysis")
+    prev_frame = frame_store.get_image(state.previous_frame_id)
+    curr_frame = frame_store.get_image(state.current_frame_id)
+
+    blocks: list[dict] = [{"type": "text", "text": Prompts.DIFF_FRAME_REGIONS}]
+    for region in regions:
+        prev_image_data = encode_png_base64(crop_region(prev_frame, region))
+        curr_image_data = encode_png_base64(crop_region(curr_frame, region))
+
+        logger.debug(f"Region {region} image data lengths: {len(prev_image_data)}, {len(curr_image_data)}")
+        blocks += [image_block(prev_image_data), image_block(curr_image_data)]
+
+    return blocks
 
 
 def analyze_diff_frames(state: State) -> dict:
@@ -16,81 +62,35 @@ def analyze_diff_frames(state: State) -> dict:
     Analyzes the differences between two image frames provided in the state object.
 
     This function utilizes a chat-based model to perform a detailed comparison of
-    the `previous_frame` and `current_frame` attributes within the `state`. It prepares
-    the necessary input data, initializes the model and agent, and invokes the analysis
-    agent to generate a diff analysis result. If either the `previous_frame` or
-    `current_frame` is missing from the state, the function returns an empty dictionary.
+    the frames referenced by `previous_frame_id` and `current_frame_id`. It prepares
+    the necessary input data and calls the model once in its native JSON-schema mode to
+    generate a diff analysis result. If the change is localized, only crops of
+    the changed regions are sent to the model. If either the `previous_frame_id` or
+    `current_frame_id` is missing from the state, the function returns an empty dictionary.
 
-    :param state: The state object containing `previous_frame` and `current_frame`
-        attributes as image data. Must be of type State.
+    :param state: The state object containing the `previous_frame_id` and
+        `current_frame_id` frame store handles. Must be of type State.
     :return: A dictionary containing the diff analysis result under the key
         `diff_analysis`. If the required frames are not available, returns an empty
         dictionary.
     :rtype: dict
     """
     logger.trace("Entering analyze_diff_frames function")
-    if state.previous_frame is None or state.current_frame is None:
+    if state.previous_frame_id is None or state.current_frame_id is None:
         logger.debug("Previous frame or current frame is None, returning empty dict")
         return {}
 
-    logger.debug("Initializing chat model for diff frames analysis")
-    model = init_chat_model(
-        model=Config.GEMINI_VISION_MODEL,
-        model_provider=Config.GEMINI_PROVIDER,
-        api_key=Config.GEMINI_API_KEY
-    )
+    image_blocks = build_image_blocks(state)
 
-    logger.debug("Creating agent for diff frames analysis")
-    agent = create_agent(
-        model=model,
-        response_format=DiffAnalysis,
-        system_prompt=SystemMessage(
-            content=Prompts.ANALYZE_DIFF_FRAMES
-        ),
-    )
-
-    logger.debug("Invoking agent for diff frames analysis")
-
-    prev_image_bytes = io.BytesIO()
-    curr_image_bytes = io.BytesIO()
-    state.previous_frame.save(prev_image_bytes, format='PNG')
-    state.current_frame.save(curr_image_bytes, format='PNG')
-    prev_image_bytes.seek(0)
-    curr_image_bytes.seek(0)
-    prev_image_data = base64.b64encode(prev_image_bytes.getvalue()).decode("utf-8")
-    curr_image_data = base64.b64encode(curr_image_bytes.getvalue()).decode("utf-8")
-
-    logger.debug(f"Previous image data length: {len(prev_image_data)}")
-    logger.debug(f"Current image data length: {len(curr_image_data)}")
-
-    result = agent.invoke(
-        {
-            "messages": [
-                HumanMessage(
-                    content=[
-                        {
-                            "type": "text",
-                            "text": Prompts.ANALYZE_STATIC_FRAME
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{prev_image_data}"
-                            }
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{curr_image_data}"
-                            }
-                        }
-                    ]
-                )
-            ]
-        }
+    logger.debug("Invoking model for diff frames analysis")
+    diff_analysis = invoke_structured(
+        Config.GEMINI_VISION_MODEL,
+        DiffAnalysis,
+        Prompts.ANALYZE_DIFF_FRAMES,
+        image_blocks
     )
 
     logger.trace("Exiting analyze_diff_frames function")
     return {
-        "diff_analysis": result["structured_response"]
+        "diff_analysis": diff_analysis
     }
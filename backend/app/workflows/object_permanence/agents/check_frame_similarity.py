@@ -1,7 +1,9 @@
 from loguru import logger
 
+from app.workflows.object_permanence.frame_store import frame_store
+from app.workflows.object_permanence.gating import gate_registry
 from app.workflows.object_permanence.state import State
-from app.workflows.object_permanence.tools.compare_images import compare_images
+from app.workflows.object_permanence.tools.compare_images import compute_similarity
 
 
 def check_frame_similarity(state: State) -> dict:
@@ -9,23 +11,35 @@ def check_frame_similarity(state: State) -> dict:
     Analyze the similarity between the previous and current frames and determine if
     analysis should be conducted based on the comparison result.
 
-    :param state: A State object that contains the previous and current frames to
-        be analyzed. Must include `previous_frame` and `current_frame` attributes.
+    The SSIM score is passed to the adaptive gate of the state's device, which
+    decides against a threshold tuned to the device's analysis budget.
+
+    :param state: A State object that contains the ids of the previous and current
+        frames to be analyzed. Must include `previous_frame_id` and `current_frame_id`
+        attributes.
     :type state: State
     :return: A dictionary containing the result of whether further analysis is
-        required, with the key `should_analyze`.
+        required, with the key `should_analyze`, and the gating decision under
+        the key `gate_decision`.
     :rtype: dict
     """
     logger.trace("Entering check_frame_similarity function")
-    if state.previous_frame is None or state.current_frame is None:
+    if state.previous_frame_id is None or state.current_frame_id is None:
         logger.debug("Previous frame or current frame is None, returning empty dict")
         return {}
 
     logger.debug("Comparing previous and current frames")
-    should_analyze = compare_images(state.current_frame, state.previous_frame)
-    logger.debug(f"Comparison result: {should_analyze}")
+    score = compute_similarity(
+        frame_store.get_grayscale(state.current_frame_id),
+        frame_store.get_grayscale(state.previous_frame_id)
+    )
+
+    logger.debug(f"Gating score for tenant: {state.tenant_id}, device: {state.device_id}")
+    decision = gate_registry.decide(state.tenant_id, state.device_id, score)
+    logger.debug(f"Comparison result: {decision.should_analyze}")
 
     logger.trace("Exiting check_frame_similarity function")
     return {
-        "should_analyze": should_analyze
+        "gate_decision": decision,
+        "should_analyze": decision.should_analyze
     }
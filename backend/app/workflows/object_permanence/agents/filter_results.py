@@ -1,25 +1,137 @@
-from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import SystemMessage, HumanMessage
+from concurrent.futures import ThreadPoolExecutor
+
 from loguru import logger
 
+from app.core.batching import MicroBatcher
 from app.core.config import Config
+from app.core.llm import invoke_structured
 from app.workflows.object_permanence.prompts import Prompts
-from app.workflows.object_permanence.state import State, FilteredResults
+from app.workflows.object_permanence.state import (
+    State, StaticAnalysis, DiffAnalysis, FilteredResults, BatchedFilteredResults
+)
+
+# The tenant id, static analysis and diff analysis of a workflow run.
+FilterInput = tuple[str, StaticAnalysis, DiffAnalysis]
+
+
+def filter_single(filter_input: FilterInput) -> FilteredResults:
+    """
+    Filters the static and differential analysis of a single workflow run.
+
+    :param filter_input: The tenant id and the static and differential analysis to filter.
+    :type filter_input: FilterInput
+    :return: The filtered results.
+    :rtype: FilteredResults
+    """
+    _, static_analysis, diff_analysis = filter_input
+    return invoke_structured(
+        Config.GEMINI_FAST_MODEL,
+        FilteredResults,
+        Prompts.FILTER_RESULTS,
+        [
+            {
+                "type": "text",
+                "text": str(static_analysis.model_dump())
+            },
+            {
+                "type": "text",
+                "text": str(diff_analysis.model_dump())
+            }
+        ]
+    )
+
+
+def filter_batch(filter_inputs: list[FilterInput]) -> list[FilteredResults]:
+    """
+    Filters the analyses of several workflow runs of the same tenant with a single
+    model call. The inputs are sent as numbered payloads and the model returns one
+    result per payload, tagged with the payload's number. Payloads whose number the
+    model left out or returned more than once are filtered again on their own, in
+    parallel, while the results that matched are kept.
+
+    :param filter_inputs: The tenant ids and the static and differential analyses to filter.
+    :type filter_inputs: list[FilterInput]
+    :return: The filtered results, in the same order as the inputs.
+    :rtype: list[FilteredResults]
+    """
+    if len(filter_inputs) == 1:
+        return [filter_single(filter_inputs[0])]
+
+    if len({tenant_id for tenant_id, _, _ in filter_inputs}) != 1:
+        raise ValueError("A filter batch must only contain the analyses of a single tenant")
+
+    logger.debug(f"Filtering a batch of {len(filter_inputs)} payloads")
+    content = []
+    for index, (_, static_analysis, diff_analysis) in enumerate(filter_inputs):
+        content += [
+            {
+                "type": "text",
+                "text": f"PAYLOAD {index}"
+            },
+            {
+                "type": "text",
+                "text": str(static_analysis.model_dump())
+            },
+            {
+                "type": "text",
+                "text": str(diff_analysis.model_dump())
+            }
+        ]
+
+    response = invoke_structured(
+        Config.GEMINI_FAST_MODEL,
+        BatchedFilteredResults,
+        Prompts.FILTER_RESULTS + Prompts.FILTER_RESULTS_BATCH,
+        content
+    )
+    results: dict[int, FilteredResults] = {}
+    duplicated: set[int] = set()
+    for result in response.results:
+        if result.payload_index in results:
+            duplicated.add(result.payload_index)
+        elif 0 <= result.payload_index < len(filter_inputs):
+            results[result.payload_index] = FilteredResults(entries=result.entries)
+    for index in duplicated:
+        results.pop(index)
+
+    unmatched = [index for index in range(len(filter_inputs)) if index not in results]
+    if unmatched:
+        logger.warning(
+            f"Batched filter returned no unique result for payloads {unmatched} of {len(filter_inputs)}, "
+            f"filtering them one by one"
+        )
+        with ThreadPoolExecutor(max_workers=len(unmatched)) as executor:
+            retried = executor.map(filter_single, [filter_inputs[index] for index in unmatched])
+            results.update(zip(unmatched, retried))
+
+    return [results[index] for index in range(len(filter_inputs))]
+
+
+filter_batcher: MicroBatcher[FilterInput, FilteredResults] = MicroBatcher(
+    filter_batch,
+    max_batch_size=Config.FILTER_BATCH_SIZE,
+    max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+    name="filter-results",
+    # Never mix the observations of different patients in one prompt.
+    key=lambda filter_input: filter_input[0]
+)
 
 
 def filter_results(state: State) -> dict:
     """
     Filters results using static and differential analysis data from the given state. This
-    function employs a chat model-based agent to generate filtered outputs based on the
-    provided inputs. If either static or diff analysis is absent, an empty dictionary is
-    returned.
+    function employs a chat model, called once in its native JSON-schema mode, to generate
+    filtered outputs based on the provided inputs. If either static or diff analysis is
+    absent, an empty dictionary is returned.
+
+    The inputs are submitted to a micro-batcher, which merges the filter calls of
+    concurrent workflow runs of the same tenant into a single model call.
 
     :param state: The state containing static analysis and diff analysis data used for
         filtering. Must be an instance of the `State` class with appropriate attributes.
 
     :return: A dictionary containing filtered results under the key "filtered_results"
-        generated through the agent. If the analysis data in the state is not available,
+        generated through the model. If the analysis data in the state is not available,
         an empty dictionary is returned.
     :rtype: dict
     """
@@ -28,48 +140,10 @@ def filter_results(state: State) -> dict:
         logger.debug("Static analysis or diff analysis is None, returning empty dict")
         return {}
 
-    logger.debug("Initializing chat model")
-    model = init_chat_model(
-        model=Config.GEMINI_FAST_MODEL,
-        model_provider=Config.GEMINI_PROVIDER,
-        api_key=Config.GEMINI_API_KEY
-    )
-
-    logger.debug("Creating agent for filtering results")
-    agent = create_agent(
-        model=model,
-        response_format=FilteredResults,
-        system_prompt=SystemMessage(
-            content=Prompts.FILTER_RESULTS
-        ),
-    )
-
-    logger.debug("Invoking agent to filter results")
-    result = agent.invoke(
-        {
-            "messages": [
-                HumanMessage(
-                    content=[
-                        {
-                            "type": "text",
-                            "text": Prompts.FILTER_RESULTS
-                        },
-                        {
-                            "type": "text",
-                            "text": str(state.static_analysis.model_dump())
-                        },
-                        {
-                            "type": "text",
-                            "text": str(state.diff_analysis.model_dump())
-                        }
-                    ]
-                )
-            ]
-        }
-    )
-    logger.debug(f"Agent invocation result: {result}")
+    logger.debug("Submitting analyses to the filter batcher")
+    filtered_results = filter_batcher.submit((state.tenant_id, state.static_analysis, state.diff_analysis))
 
     logger.trace("Exiting filter_results function")
     return {
-        "filtered_results": result["structured_response"]
+        "filtered_results": filtered_results
     }
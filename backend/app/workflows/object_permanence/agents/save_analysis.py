@@ -1,43 +1,30 @@
 import time
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.runnables import RunnableConfig
 from loguru import logger
 
-from app.core.config import Config
-from app.crud.object_permanence import create_log_entry
+from app.core.embeddings import get_embedding_batcher
+from app.crud.object_permanence import create_log_entry, has_log_entries_for_run
 from app.workflows.object_permanence.state import State
 
 
-def get_embeddings(text: str) -> list[float]:
-    """
-    Gets the embeddings for a given text using the specified embedding model and API key.
-
-    This function utilizes the Google Generative AI Embeddings model to generate a
-    vector representation for the input text. It requires proper configuration of the
-    Google API key to function correctly.
-
-    :param text: The input text for which embeddings need to be generated.
-    :type text: str
-    :return: A list of floating-point values representing the embedding of the input text.
-    :rtype: list[float]
-    """
-    logger.trace("Entering get_embeddings function")
-    logger.debug(f"Getting embeddings for text: '{text}'")
-    embeddings = GoogleGenerativeAIEmbeddings(model=Config.GEMINI_EMBEDDING_MODEL, google_api_key=Config.GEMINI_API_KEY)
-    vector = embeddings.embed_query(text)
-    logger.trace("Exiting get_embeddings function")
-    return vector
-
-
-def save_analysis(state: State) -> dict:
+def save_analysis(state: State, config: RunnableConfig) -> dict:
     """
     Processes the filtered results within a given state, computes embeddings for the
     content, creates log entries in the database, and returns a status dictionary upon
     completion.
 
-    :param state: The current state containing filtered results and database session
-                  information.
+    All entries are embedded in one batched call, shared with concurrent runs, before
+    anything is written, and the log entries of a run are committed in a single
+    transaction tagged with the run id. If the run is resumed after the entries were
+    already stored, nothing is written again.
+
+    :param state: The current state containing filtered results and the tenant and
+                  device the frames came from.
     :type state: State
+    :param config: The run configuration. `configurable.get_db_session` provides the
+                   database session and `configurable.run_id` is the run id.
+    :type config: RunnableConfig
     :return: A dictionary indicating the save completion status. Returns an empty
              dictionary if no filtered results are available for processing.
     :rtype: dict
@@ -47,21 +34,38 @@ def save_analysis(state: State) -> dict:
         logger.debug("No filtered results to save, returning empty dict")
         return {}
 
+    db_session = config["configurable"]["get_db_session"]()
+    run_id = config["configurable"].get("run_id")
+
+    if run_id is not None and has_log_entries_for_run(db_session, state.tenant_id, run_id):
+        logger.debug(f"Entries for run {run_id} were already saved, skipping")
+        logger.trace("Exiting save_analysis function")
+        return {"save_status": True}
+
     current_time = time.time()
     logger.debug(f"Current time: {current_time}")
 
-    for entry in state.filtered_results.entries:
-        logger.debug(f"Processing entry: {entry.content}")
-        embedding = get_embeddings(entry.content)
+    logger.debug(f"Embedding {len(state.filtered_results.entries)} entries")
+    embeddings = get_embedding_batcher().submit_many(
+        [entry.content for entry in state.filtered_results.entries]
+    )
+
+    for entry, embedding in zip(state.filtered_results.entries, embeddings):
         logger.debug(f"Creating log entry for object: {entry.object_name}")
         create_log_entry(
-            state.db_session,
+            db_session,
+            state.tenant_id,
             entry.content,
             embedding,
             current_time,
-            entry.object_name
+            entry.object_name,
+            entry.log_type,
+            device_id=state.device_id,
+            run_id=run_id,
+            commit=False
         )
 
+    db_session.commit()
     logger.debug("Save analysis complete")
     logger.trace("Exiting save_analysis function")
     return {"save_status": True}
@@ -0,0 +1,146 @@
+import base64
+import io
+import threading
+import uuid
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+from app.workflows.object_permanence.tools.compare_images import to_grayscale
+
+
+def encode_png_base64(image: Image.Image) -> str:
+    """
+    Encodes an image as a base64 PNG string.
+
+    :param image: The image to encode.
+    :type image: Image.Image
+    :return: The base64 encoded PNG data of the image.
+    :rtype: str
+    """
+    image_bytes = io.BytesIO()
+    image.save(image_bytes, format='PNG')
+    return base64.b64encode(image_bytes.getvalue()).decode("utf-8")
+
+
+class FrameEntry:
+    """
+    A single decoded frame together with the encodings derived from it. Each encoding
+    is computed at most once, on first use, and shared by every node that needs it.
+    Each encoding has its own lock, so parallel branches needing different encodings
+    of the same frame never wait for each other.
+    """
+
+    def __init__(self, image: Image.Image):
+        self.image = image
+        self.png_base64: Optional[str] = None
+        self.grayscale: Optional[np.ndarray] = None
+        self.png_base64_lock = threading.Lock()
+        self.grayscale_lock = threading.Lock()
+
+
+class FrameStore:
+    """
+    Holds the frames of in-flight workflow runs, keyed by an opaque frame id.
+
+    The workflow `State` only carries frame ids, so LangGraph never copies or merges
+    images between branches. Nodes resolve the image, its PNG/base64 encoding or its
+    grayscale array lazily through the store, and the caller releases the frames once
+    the run is finished.
+    """
+
+    def __init__(self):
+        self._frames: dict[str, FrameEntry] = {}
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, frame_id: Optional[str] = None) -> str:
+        """
+        Decodes the raw image bytes and registers the frame in the store.
+
+        :param data: The encoded image bytes (e.g. an uploaded PNG or JPEG).
+        :type data: bytes
+        :param frame_id: The id to store the frame under. A new id is generated when
+            omitted; an existing id is given when re-supplying the frames of a resumed run.
+        :type frame_id: Optional[str]
+        :return: The id under which the frame was stored.
+        :rtype: str
+        """
+        image = Image.open(io.BytesIO(data))
+        image.load()  # Force load the image data to prevent issues with lazy loading
+
+        frame_id = frame_id or uuid.uuid4().hex
+        with self._lock:
+            self._frames[frame_id] = FrameEntry(image)
+
+        logger.debug(f"Stored frame {frame_id} ({image.width}x{image.height})")
+        return frame_id
+
+    def _get_entry(self, frame_id: str) -> FrameEntry:
+        with self._lock:
+            entry = self._frames.get(frame_id)
+
+        if entry is None:
+            raise KeyError(f"Frame {frame_id} is not in the frame store")
+        return entry
+
+    def get_image(self, frame_id: str) -> Image.Image:
+        """
+        Returns the decoded image for the given frame id.
+
+        :param frame_id: The id returned by :meth:`put`.
+        :type frame_id: str
+        :return: The decoded image.
+        :rtype: Image.Image
+        """
+        return self._get_entry(frame_id).image
+
+    def get_png_base64(self, frame_id: str) -> str:
+        """
+        Returns the frame encoded as a base64 PNG string, encoding it on first use.
+
+        :param frame_id: The id returned by :meth:`put`.
+        :type frame_id: str
+        :return: The base64 encoded PNG data of the frame.
+        :rtype: str
+        """
+        entry = self._get_entry(frame_id)
+        with entry.png_base64_lock:
+            if entry.png_base64 is None:
+                logger.debug(f"Encoding frame {frame_id} as PNG")
+                entry.png_base64 = encode_png_base64(entry.image)
+            return entry.png_base64
+
+    def get_grayscale(self, frame_id: str) -> np.ndarray:
+        """
+        Returns the resized grayscale array of the frame, computing it on first use.
+
+        :param frame_id: The id returned by :meth:`put`.
+        :type frame_id: str
+        :return: The grayscale array produced by `to_grayscale`.
+        :rtype: np.ndarray
+        """
+        entry = self._get_entry(frame_id)
+        with entry.grayscale_lock:
+            if entry.grayscale is None:
+                logger.debug(f"Converting frame {frame_id} to grayscale")
+                entry.grayscale = to_grayscale(entry.image)
+            return entry.grayscale
+
+    def release(self, *frame_ids: Optional[str]) -> None:
+        """
+        Removes frames from the store. Unknown and `None` ids are ignored.
+
+        :param frame_ids: The ids of the frames to remove.
+        :type frame_ids: Optional[str]
+        """
+        with self._lock:
+            for frame_id in frame_ids:
+                if frame_id is not None:
+                    self._frames.pop(frame_id, None)
+
+        logger.debug(f"Released frames: {frame_ids}")
+
+
+frame_store = FrameStore()
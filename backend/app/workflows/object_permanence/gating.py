@@ -0,0 +1,262 @@
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, Field
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.core.config import Config
+from app.core.db import engine
+from app.models.gating import GateState
+
+
+class GateDecision(BaseModel):
+    tenant_id: str = Field(description="The patient the device belongs to.")
+    device_id: str = Field(description="The device the frames came from.")
+    score: float = Field(description="The SSIM score between the previous and current frames.")
+    threshold: float = Field(description="The threshold the score was compared against.")
+    should_analyze: bool = Field(description="Whether the frames were sent for analysis.")
+    calls_last_hour: int = Field(description="The number of analyses of the device in the last hour.")
+    frames_per_hour: float = Field(description="The estimated frame rate of the device.")
+    timestamp: float = Field(description="When the decision was made.")
+
+
+class GateStats(BaseModel):
+    tenant_id: str = Field(description="The patient the device belongs to.")
+    device_id: str = Field(description="The device the statistics belong to.")
+    threshold: float = Field(description="The current threshold of the device.")
+    frames_seen: int = Field(description="The total number of frame pairs gated.")
+    analyses_triggered: int = Field(description="The total number of frame pairs sent for analysis.")
+    calls_last_hour: int = Field(description="The number of analyses in the last hour.")
+    target_calls_per_hour: float = Field(description="The configured analysis budget per hour.")
+    last_decision: Optional[GateDecision] = Field(default=None, description="The most recent decision.")
+
+
+class AdaptiveGate:
+    """
+    Similarity gate of a single device that adapts its SSIM threshold to an analysis
+    budget.
+
+    The gate keeps a window of recent SSIM scores and the times of recent analyses.
+    From the observed frame rate it derives the fraction of frames that may trigger
+    an analysis to stay within `target_calls_per_hour`, and sets the threshold to the
+    matching quantile of the score distribution. When the last hour is already over
+    budget, the fraction is scaled down further. The threshold is always clamped to
+    [`min_threshold`, `max_threshold`], so large changes (scores below
+    `min_threshold`) are always analyzed.
+
+    A gate only lives for a single decision: its state is loaded from and dumped to
+    the device's `GateState` row by the `GateRegistry`.
+    """
+
+    def __init__(
+            self,
+            tenant_id: str,
+            device_id: str,
+            target_calls_per_hour: float = Config.GATE_TARGET_CALLS_PER_HOUR,
+            initial_threshold: float = Config.GATE_THRESHOLD,
+            min_threshold: float = Config.GATE_MIN_THRESHOLD,
+            max_threshold: float = Config.GATE_MAX_THRESHOLD,
+            window_size: int = Config.GATE_WINDOW_SIZE,
+            min_samples: int = Config.GATE_MIN_SAMPLES,
+    ):
+        self.tenant_id = tenant_id
+        self.device_id = device_id
+        self.target_calls_per_hour = target_calls_per_hour
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+        self.min_samples = min_samples
+        self.threshold = min(max(initial_threshold, min_threshold), max_threshold)
+
+        self.frames_seen = 0
+        self.analyses_triggered = 0
+        self.last_decision: Optional[GateDecision] = None
+
+        self._scores: deque[tuple[float, float]] = deque(maxlen=window_size)
+        self._analyses: deque[float] = deque()
+
+    @classmethod
+    def load(cls, record: GateState) -> "AdaptiveGate":
+        """
+        Creates a gate from the persisted state of a device.
+
+        :param record: The persisted state of the device.
+        :type record: GateState
+        :return: The gate of the device.
+        :rtype: AdaptiveGate
+        """
+        gate = cls(record.tenant_id, record.device_id, initial_threshold=record.threshold)
+        gate.frames_seen = record.frames_seen
+        gate.analyses_triggered = record.analyses_triggered
+        gate._scores.extend((timestamp, score) for timestamp, score in record.scores)
+        gate._analyses.extend(record.analyses)
+        if record.last_decision is not None:
+            gate.last_decision = GateDecision.model_validate(record.last_decision)
+        return gate
+
+    def dump(self, record: GateState) -> None:
+        """
+        Writes the state of the gate to the persisted state of its device.
+
+        :param record: The persisted state of the device.
+        :type record: GateState
+        """
+        # Assign new values rather than mutating the JSON columns in place, so that
+        # SQLAlchemy detects the changes.
+        record.threshold = self.threshold
+        record.frames_seen = self.frames_seen
+        record.analyses_triggered = self.analyses_triggered
+        record.scores = [[timestamp, score] for timestamp, score in self._scores]
+        record.analyses = list(self._analyses)
+        record.last_decision = self.last_decision.model_dump() if self.last_decision else None
+
+    def _prune_analyses(self, now: float) -> None:
+        while self._analyses and self._analyses[0] < now - 3600:
+            self._analyses.popleft()
+
+    def _frames_per_hour(self) -> float:
+        if len(self._scores) < 2:
+            return 0.0
+
+        span = self._scores[-1][0] - self._scores[0][0]
+        if span <= 0:
+            return 0.0
+        return (len(self._scores) - 1) / span * 3600
+
+    def _adapt_threshold(self, frames_per_hour: float) -> None:
+        if len(self._scores) < self.min_samples or frames_per_hour <= 0:
+            return
+
+        target_fraction = self.target_calls_per_hour / frames_per_hour
+
+        # Pay back any overspend of the last hour by gating more aggressively.
+        calls_last_hour = len(self._analyses)
+        if calls_last_hour > self.target_calls_per_hour:
+            target_fraction *= self.target_calls_per_hour / calls_last_hour
+
+        target_fraction = min(max(target_fraction, 0.0), 1.0)
+        scores = np.fromiter((score for _, score in self._scores), dtype=float)
+        threshold = float(np.quantile(scores, target_fraction))
+        self.threshold = min(max(threshold, self.min_threshold), self.max_threshold)
+
+    def decide(self, score: float, now: Optional[float] = None) -> GateDecision:
+        """
+        Records the SSIM score of a frame pair and decides whether it should be analyzed.
+
+        :param score: The SSIM score between the previous and current frames.
+        :type score: float
+        :param now: The time of the decision. Defaults to the current time.
+        :type now: Optional[float]
+        :return: The gating decision, including the threshold that was applied.
+        :rtype: GateDecision
+        """
+        now = time.time() if now is None else now
+        self._prune_analyses(now)
+        self._scores.append((now, score))
+        frames_per_hour = self._frames_per_hour()
+        self._adapt_threshold(frames_per_hour)
+
+        should_analyze = score < self.threshold
+        self.frames_seen += 1
+        if should_analyze:
+            self.analyses_triggered += 1
+            self._analyses.append(now)
+
+        self.last_decision = GateDecision(
+            tenant_id=self.tenant_id,
+            device_id=self.device_id,
+            score=score,
+            threshold=self.threshold,
+            should_analyze=should_analyze,
+            calls_last_hour=len(self._analyses),
+            frames_per_hour=frames_per_hour,
+            timestamp=now,
+        )
+
+        logger.debug(f"Gate decision: {self.last_decision}")
+        return self.last_decision
+
+    def stats(self) -> GateStats:
+        """
+        Returns the current statistics of the gate.
+
+        :return: The gate statistics.
+        :rtype: GateStats
+        """
+        self._prune_analyses(time.time())
+        return GateStats(
+            tenant_id=self.tenant_id,
+            device_id=self.device_id,
+            threshold=self.threshold,
+            frames_seen=self.frames_seen,
+            analyses_triggered=self.analyses_triggered,
+            calls_last_hour=len(self._analyses),
+            target_calls_per_hour=self.target_calls_per_hour,
+            last_decision=self.last_decision,
+        )
+
+
+class GateRegistry:
+    """
+    Keeps the gate of every (tenant, device) in the `GateState` table, so that all
+    server workers share each device's score window, analysis counters and budget.
+    Without it, every worker would only see its share of a device's frames and the
+    device could spend up to the worker count times its budget.
+    """
+
+    def decide(self, tenant_id: str, device_id: str, score: float) -> GateDecision:
+        """
+        Records the SSIM score of a frame pair of the given device and decides whether
+        it should be analyzed. The device's row is locked for the duration of the
+        decision, so concurrent decisions of a device, in any worker, are serialized.
+
+        :param tenant_id: The id of the patient the device belongs to.
+        :type tenant_id: str
+        :param device_id: The id of the device.
+        :type device_id: str
+        :param score: The SSIM score between the previous and current frames.
+        :type score: float
+        :return: The gating decision.
+        :rtype: GateDecision
+        """
+        with Session(engine) as session:
+            session.exec(
+                insert(GateState)
+                .values(tenant_id=tenant_id, device_id=device_id, threshold=Config.GATE_THRESHOLD, scores=[],
+                        analyses=[])
+                .on_conflict_do_nothing()
+            )
+            record = session.exec(
+                select(GateState)
+                .where(GateState.tenant_id == tenant_id, GateState.device_id == device_id)
+                .with_for_update()
+            ).one()
+
+            gate = AdaptiveGate.load(record)
+            decision = gate.decide(score)
+            gate.dump(record)
+
+            session.add(record)
+            session.commit()
+
+        return decision
+
+    def stats(self, tenant_id: str) -> list[GateStats]:
+        """
+        Returns the statistics of every known device of a tenant.
+
+        :param tenant_id: The id of the patient whose devices are included.
+        :type tenant_id: str
+        :return: The gate statistics of the devices.
+        :rtype: list[GateStats]
+        """
+        with Session(engine) as session:
+            records = session.exec(select(GateState).where(GateState.tenant_id == tenant_id)).all()
+
+        return [AdaptiveGate.load(record).stats() for record in records]
+
+
+gate_registry = GateRegistry()
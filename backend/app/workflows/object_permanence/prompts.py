@@ -122,3 +122,18 @@ class Prompts:
         
         If all input data is filtered out (e.g., everything was "held" or low confidence), return `{"entries": []}`.
         """
+
+    DIFF_FRAME_REGIONS = \
+        """
+        The images are crops of the regions that changed between the two moments, padded with some surrounding context.
+        They are given in pairs: for each region, Image A (Start) is followed by Image B (End).
+        """
+
+    FILTER_RESULTS_BATCH = \
+        """
+        ### BATCHED INPUT
+        You will receive several independent payloads, each introduced by a `PAYLOAD <n>` line and followed by its static and diff analysis.
+        Apply the protocols above to each payload on its own; never mix objects or events between payloads.
+        
+        Return a **JSON Object** with a single key `"results"`: a list with exactly one `{"payload_index": <n>, "entries": [...]}` object per payload, where `<n>` is the number of the `PAYLOAD <n>` line the entries belong to.
+        """
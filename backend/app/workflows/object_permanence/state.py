@@ -1,8 +1,8 @@
 from typing import Optional, Literal
 
-from PIL import Image
-from pydantic import BaseModel, Field, ConfigDict
-from sqlmodel import Session
+from pydantic import BaseModel, Field
+
+from app.workflows.object_permanence.gating import GateDecision
 
 
 class Object(BaseModel):
@@ -48,13 +48,25 @@ class FilteredResults(BaseModel):
     entries: list[FilteredEntry] = Field(description="A list of filtered entries.", default_factory=list)
 
 
+class PayloadFilteredResults(FilteredResults):
+    payload_index: int = Field(description="The number <n> of the `PAYLOAD <n>` these results belong to.")
+
+
+class BatchedFilteredResults(BaseModel):
+    results: list[PayloadFilteredResults] = Field(
+        description="The filtered results of each payload, one per payload.",
+        default_factory=list)
+
+
 class State(BaseModel):
     # Inputs
-    current_frame: Image.Image
-    previous_frame: Optional[Image.Image] = None
+    tenant_id: str
+    current_frame_id: str
+    previous_frame_id: Optional[str] = None
+    device_id: str = "default"
 
     # Internal
-    db_session: Session
+    gate_decision: Optional[GateDecision] = None
     should_analyze: bool = False
     static_analysis: Optional[StaticAnalysis] = None
     diff_analysis: Optional[DiffAnalysis] = None
@@ -62,6 +74,3 @@ class State(BaseModel):
 
     # Outputs
     save_status: bool = False
-
-    # Config
-    model_config = ConfigDict(arbitrary_types_allowed=True)
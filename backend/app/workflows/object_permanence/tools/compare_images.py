@@ -5,48 +5,53 @@ from loguru import logger
 from skimage.metrics import structural_similarity as ssim
 
 
-def compare_images(frame1: Image.Image, frame2: Image.Image, threshold: float = 0.85) -> bool:
+def to_grayscale(frame: Image.Image, size: tuple[int, int] = (256, 256)) -> np.ndarray:
     """
-    Compares two images to determine if they are significantly different, based on a
-    threshold value. The comparison uses Structural Similarity Index Measure (SSIM),
-    which evaluates the similarity of the images' structure. For optimization, the
-    images are resized to 256x256 and converted to grayscale.
-
-    :param frame1: The first image to compare.
-    :type frame1: Image.Image
-    :param frame2: The second image to compare.
-    :type frame2: Image.Image
-    :param threshold: The similarity threshold. If the SSIM score is less than this
-        value, the images are considered different. Default is 0.85.
-    :type threshold: float
-    :return: True if the images are significantly different; False otherwise.
-    :rtype: bool
+    Converts an image to a resized grayscale NumPy array suitable for structural
+    comparison. Color is discarded because SSIM works best on structure, and the
+    image is resized to keep the comparison cheap.
+
+    :param frame: The image to convert.
+    :type frame: Image.Image
+    :param size: The (width, height) to resize the grayscale image to. Default is 256x256.
+    :type size: tuple[int, int]
+    :return: The resized grayscale image as a 2D NumPy array.
+    :rtype: np.ndarray
     """
-    logger.trace("Entering compare_images function")
-    logger.debug(f"Comparison threshold: {threshold}")
+    logger.trace("Entering to_grayscale function")
 
-    # 1. Convert PIL Images to NumPy arrays (RGB)
-    logger.debug("Converting PIL Images to NumPy arrays")
-    img1_np = np.array(frame1)
-    img2_np = np.array(frame2)
+    # 1. Convert PIL Image to NumPy array (RGB)
+    logger.debug("Converting PIL Image to NumPy array")
+    img_np = np.array(frame.convert("RGB"))
 
     # 2. Convert to Grayscale (SSIM works best on structure, color is noise)
-    logger.debug("Converting images to grayscale")
-    gray1 = cv2.cvtColor(img1_np, cv2.COLOR_RGB2GRAY)
-    gray2 = cv2.cvtColor(img2_np, cv2.COLOR_RGB2GRAY)
+    logger.debug("Converting image to grayscale")
+    gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
 
     # 3. Resize for Performance (Critical Optimization)
-    logger.debug("Resizing images to 256x256 for performance")
-    gray1 = cv2.resize(gray1, (256, 256))
-    gray2 = cv2.resize(gray2, (256, 256))
+    logger.debug(f"Resizing image to {size[0]}x{size[1]} for performance")
+    gray = cv2.resize(gray, size)
 
-    # 4. Compute SSIM
+    logger.trace("Exiting to_grayscale function")
+    return gray
+
+
+def compute_similarity(gray1: np.ndarray, gray2: np.ndarray) -> float:
+    """
+    Computes the Structural Similarity Index Measure (SSIM) between two grayscale
+    arrays produced by :func:`to_grayscale`.
+
+    :param gray1: The first grayscale image to compare.
+    :type gray1: np.ndarray
+    :param gray2: The second grayscale image to compare.
+    :type gray2: np.ndarray
+    :return: The SSIM score, where 1.0 means the images are identical.
+    :rtype: float
+    """
+    logger.trace("Entering compute_similarity function")
     logger.debug("Computing Structural Similarity Index (SSIM)")
-    score = ssim(gray1, gray2, full=False)
+    score = float(ssim(gray1, gray2, full=False))
     logger.debug(f"SSIM score: {score}")
+    logger.trace("Exiting compute_similarity function")
+    return score
 
-    # 5. Return Logic
-    result = score < threshold
-    logger.debug(f"Images are {'different' if result else 'similar'}")
-    logger.trace("Exiting compare_images function")
-    return result
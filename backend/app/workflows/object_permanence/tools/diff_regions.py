@@ -0,0 +1,131 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+# A region box as (left, top, right, bottom) fractions of the frame size.
+Box = tuple[float, float, float, float]
+
+
+def find_change_regions(
+        gray1: np.ndarray,
+        gray2: np.ndarray,
+        pixel_threshold: int = 25,
+        min_region_fraction: float = 0.001,
+        global_change_fraction: float = 0.4,
+        max_regions: int = 3
+) -> Optional[list[Box]]:
+    """
+    Finds the regions that changed between two grayscale arrays produced by
+    `to_grayscale`. The absolute difference of the arrays is thresholded into a
+    change mask, whose connected regions are returned as normalized bounding boxes.
+
+    When the change is global (e.g. a lighting change or camera movement) or cannot
+    be localized, `None` is returned so that the caller falls back to the full frames.
+
+    :param gray1: The first grayscale image.
+    :type gray1: np.ndarray
+    :param gray2: The second grayscale image.
+    :type gray2: np.ndarray
+    :param pixel_threshold: The minimum per-pixel intensity difference counted as a
+        change. Default is 25.
+    :type pixel_threshold: int
+    :param min_region_fraction: The minimum area of a region, as a fraction of the
+        frame, to be kept. Smaller regions are treated as noise. Default is 0.001.
+    :type min_region_fraction: float
+    :param global_change_fraction: If the changed area or the area covered by the
+        regions exceeds this fraction of the frame, the change is considered global.
+        Default is 0.4.
+    :type global_change_fraction: float
+    :param max_regions: The maximum number of separate regions. If more are found,
+        they are merged into their common bounding box. Default is 3.
+    :type max_regions: int
+    :return: The changed regions as (left, top, right, bottom) fractions of the frame
+        size, or None if the full frames should be used.
+    :rtype: Optional[list[Box]]
+    """
+    logger.trace("Entering find_change_regions function")
+    height, width = gray1.shape[:2]
+
+    # 1. Build the change mask
+    logger.debug("Computing change mask")
+    diff = cv2.absdiff(gray1, gray2)
+    diff = cv2.GaussianBlur(diff, (5, 5), 0)
+    _, mask = cv2.threshold(diff, pixel_threshold, 255, cv2.THRESH_BINARY)
+    mask = cv2.dilate(mask, None, iterations=2)
+
+    changed_fraction = cv2.countNonZero(mask) / mask.size
+    logger.debug(f"Changed fraction: {changed_fraction}")
+    if changed_fraction > global_change_fraction:
+        logger.debug("Change is global, falling back to full frames")
+        return None
+
+    # 2. Extract the bounding boxes of the changed regions
+    logger.debug("Extracting changed regions")
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_region_fraction * width * height
+    rects = [cv2.boundingRect(contour) for contour in contours]
+    rects = [(x, y, x + w, y + h) for x, y, w, h in rects if w * h >= min_area]
+    if not rects:
+        logger.debug("No localized change found, falling back to full frames")
+        return None
+
+    # 3. Merge into a single region if there are too many
+    if len(rects) > max_regions:
+        logger.debug(f"Merging {len(rects)} regions into one")
+        rects = [(
+            min(rect[0] for rect in rects),
+            min(rect[1] for rect in rects),
+            max(rect[2] for rect in rects),
+            max(rect[3] for rect in rects)
+        )]
+
+    covered_fraction = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects) / (width * height)
+    logger.debug(f"Covered fraction: {covered_fraction}")
+    if covered_fraction > global_change_fraction:
+        logger.debug("Regions cover most of the frame, falling back to full frames")
+        return None
+
+    boxes = [(x0 / width, y0 / height, x1 / width, y1 / height) for x0, y0, x1, y1 in rects]
+    logger.debug(f"Changed regions: {boxes}")
+    logger.trace("Exiting find_change_regions function")
+    return boxes
+
+
+def crop_region(frame: Image.Image, box: Box, padding: float = 0.25, min_size: int = 128) -> Image.Image:
+    """
+    Crops a region from a frame, padded with surrounding context so that the model can
+    tell where in the scene the region is.
+
+    :param frame: The full resolution frame.
+    :type frame: Image.Image
+    :param box: The region as (left, top, right, bottom) fractions of the frame size.
+    :type box: Box
+    :param padding: The context added on each side, as a fraction of the region size.
+        Default is 0.25.
+    :type padding: float
+    :param min_size: The minimum width and height of the crop in pixels. Default is 128.
+    :type min_size: int
+    :return: The cropped region.
+    :rtype: Image.Image
+    """
+    left, top, right, bottom = (
+        box[0] * frame.width,
+        box[1] * frame.height,
+        box[2] * frame.width,
+        box[3] * frame.height
+    )
+
+    pad_x = max((right - left) * padding, (min_size - (right - left)) / 2, 0)
+    pad_y = max((bottom - top) * padding, (min_size - (bottom - top)) / 2, 0)
+
+    crop_box = (
+        max(int(left - pad_x), 0),
+        max(int(top - pad_y), 0),
+        min(int(right + pad_x), frame.width),
+        min(int(bottom + pad_y), frame.height)
+    )
+    logger.debug(f"Cropping region {crop_box} from {frame.width}x{frame.height} frame")
+    return frame.crop(crop_box)
@@ -1,7 +1,12 @@
+from functools import lru_cache
+from typing import Optional
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from loguru import logger
 
+from app.core.checkpointer import get_checkpointer
 from app.workflows.object_permanence.agents.analyze_diff_frames import analyze_diff_frames
 from app.workflows.object_permanence.agents.analyze_static_frame import analyze_static_frame
 from app.workflows.object_permanence.agents.check_frame_similarity import check_frame_similarity
@@ -10,7 +15,7 @@ from app.workflows.object_permanence.agents.save_analysis import save_analysis
 from app.workflows.object_permanence.state import State
 
 
-def create_compiled_state_graph() -> CompiledStateGraph:
+def create_compiled_state_graph(checkpointer: Optional[BaseCheckpointSaver] = None) -> CompiledStateGraph:
     """
     Creates and compiles a `StateGraph` representing the workflow for object permanence analysis.
 
@@ -19,6 +24,12 @@ def create_compiled_state_graph() -> CompiledStateGraph:
     between states, and the finish point of the graph. Finally, it compiles the graph into
     a `CompiledStateGraph` object.
 
+    When a checkpointer is given, the output of every node is persisted under the run's
+    `thread_id`, so a failed run can be resumed from its last completed node instead of
+    repeating the vision calls.
+
+    :param checkpointer: The checkpoint saver used to persist the graph state, if any.
+    :type checkpointer: Optional[BaseCheckpointSaver]
     :raises WorkflowError: If the `StateGraph` cannot be compiled due to invalid definitions.
     :return: A compiled state graph containing the defined workflow for object permanence analysis
     :rtype: CompiledStateGraph
@@ -54,6 +65,18 @@ def create_compiled_state_graph() -> CompiledStateGraph:
     workflow.set_finish_point("save_analysis")
 
     logger.debug("Compiling the state graph")
-    compiled_graph = workflow.compile()
+    compiled_graph = workflow.compile(checkpointer=checkpointer)
     logger.trace("Exiting create_compiled_state_graph function")
     return compiled_graph
+
+
+@lru_cache
+def get_compiled_state_graph() -> CompiledStateGraph:
+    """
+    Returns the workflow graph compiled with the Postgres checkpointer. The graph is
+    compiled once per process and shared by all requests.
+
+    :return: The compiled, checkpointed state graph
+    :rtype: CompiledStateGraph
+    """
+    return create_compiled_state_graph(get_checkpointer())
@@ -0,0 +1,91 @@
+"""
+Import-time and startup benchmark of the backend.
+
+Every measurement runs in a fresh interpreter so that nothing is cached between runs:
+
+- `import`: time to import the `app` module (what a lazily importing worker pays
+  before it can serve).
+- `warm-up`: time of `warm_up()` after the import (what the pre-fork master pays
+  once, and what a lazy worker pays on its first workflow request).
+- `serve` (with `--serve`): time from launching uvicorn until `GET /` answers. This
+  runs the lifespan, so the database must be reachable.
+
+Usage (from the backend directory):
+
+    uv run python -m benchmarks.startup --runs 5 [--serve]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+WARM_UP_SNIPPET = """
+import time
+import app
+from app.core.warmup import warm_up
+start = time.perf_counter()
+warm_up()
+print(time.perf_counter() - start)
+"""
+
+
+def time_snippet(snippet: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_serve(port: int, timeout: float) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError(f"The server did not answer within {timeout} seconds")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:<10} median {statistics.median(samples) * 1000:8.1f} ms"
+        f"   min {min(samples) * 1000:8.1f} ms"
+        f"   max {max(samples) * 1000:8.1f} ms"
+        f"   ({len(samples)} runs)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters per measurement.")
+    parser.add_argument("--serve", action="store_true", help="Also measure the time until uvicorn serves.")
+    parser.add_argument("--port", type=int, default=8765, help="Port used by the --serve measurement.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout of the --serve measurement.")
+    args = parser.parse_args()
+
+    report("import", [time_snippet(IMPORT_SNIPPET) for _ in range(args.runs)])
+    report("warm-up", [time_snippet(WARM_UP_SNIPPET) for _ in range(args.runs)])
+    if args.serve:
+        report("serve", [time_serve(args.port, args.timeout) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
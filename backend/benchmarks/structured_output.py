@@ -0,0 +1,156 @@
+"""
+Benchmark of the structured-output call paths of the workflow nodes.
+
+Compares, for the same input:
+
+- `agent`: the previous path, a `create_agent` tool-calling loop with a
+  `response_format`, with the prompt sent both as system prompt and as a human
+  text block.
+- `lean`: `invoke_structured`, a single native JSON-schema call with the prompt sent
+  once.
+
+For each path it reports the median latency, the model round-trips and the input,
+output and total tokens per call. It calls the configured Gemini models, so the
+`GEMINI_*` settings must be set.
+
+Usage (from the backend directory):
+
+    uv run python -m benchmarks.structured_output --runs 5 [--image frame.png]
+
+Without `--image` only the `filter_results` call is benchmarked; with it, the
+`analyze_static_frame` call on that image is benchmarked as well.
+"""
+import argparse
+import base64
+import statistics
+import time
+
+from langchain.agents import create_agent
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from pydantic import BaseModel
+
+from app.core.config import Config
+from app.core.llm import get_chat_model, invoke_structured_raw
+from app.workflows.object_permanence.prompts import Prompts
+from app.workflows.object_permanence.state import (
+    Object, StaticAnalysis, Event, DiffAnalysis, FilteredResults
+)
+
+SAMPLE_STATIC_ANALYSIS = StaticAnalysis(
+    scene_description="A kitchen counter next to a window.",
+    objects=[
+        Object(
+            object_name="Silver Car Keys",
+            category="keys",
+            status="resting",
+            location_description="on the white counter, next to the red mug",
+            supporting_surface="Kitchen Counter",
+            visual_details="Silver key ring with a blue fob",
+            confidence="high"
+        ),
+        Object(
+            object_name="Black Smartphone",
+            category="electronics",
+            status="held",
+            location_description="in the user's right hand",
+            supporting_surface="Hand",
+            visual_details="Black case, cracked corner",
+            confidence="medium"
+        )
+    ]
+)
+
+SAMPLE_DIFF_ANALYSIS = DiffAnalysis(
+    events=[
+        Event(
+            event_type="placed",
+            object_name="Silver Car Keys",
+            action_description="The user placed the car keys on the kitchen counter.",
+            location_context="The Kitchen Counter",
+            confidence="high"
+        )
+    ]
+)
+
+
+def run_agent(model: str, response_format: type[BaseModel], prompt: str, content: list[dict]) -> dict:
+    agent = create_agent(
+        model=get_chat_model(model),
+        response_format=response_format,
+        system_prompt=SystemMessage(content=prompt),
+    )
+    result = agent.invoke(
+        {"messages": [HumanMessage(content=[{"type": "text", "text": prompt}, *content])]}
+    )
+
+    ai_messages = [message for message in result["messages"] if isinstance(message, AIMessage)]
+    return {
+        "round_trips": len(ai_messages),
+        "usage": [message.usage_metadata or {} for message in ai_messages],
+    }
+
+
+def run_lean(model: str, response_format: type[BaseModel], prompt: str, content: list[dict]) -> dict:
+    result = invoke_structured_raw(model, response_format, prompt, content)
+    return {
+        "round_trips": 1,
+        "usage": [result["raw"].usage_metadata or {}],
+    }
+
+
+def benchmark(name: str, model: str, response_format: type[BaseModel], prompt: str, content: list[dict],
+              runs: int) -> None:
+    print(f"\n{name} ({model})")
+    for path, run in [("agent", run_agent), ("lean", run_lean)]:
+        latencies, round_trips, input_tokens, output_tokens = [], [], [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = run(model, response_format, prompt, content)
+            latencies.append(time.perf_counter() - start)
+            round_trips.append(result["round_trips"])
+            input_tokens.append(sum(usage.get("input_tokens", 0) for usage in result["usage"]))
+            output_tokens.append(sum(usage.get("output_tokens", 0) for usage in result["usage"]))
+
+        print(
+            f"  {path:<6} latency {statistics.median(latencies) * 1000:8.1f} ms"
+            f"   round-trips {statistics.mean(round_trips):4.1f}"
+            f"   input tokens {statistics.mean(input_tokens):8.1f}"
+            f"   output tokens {statistics.mean(output_tokens):7.1f}"
+            f"   total tokens {statistics.mean(input_tokens) + statistics.mean(output_tokens):8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of calls per path.")
+    parser.add_argument("--image", help="A PNG frame to benchmark the static frame analysis with.")
+    args = parser.parse_args()
+
+    benchmark(
+        "filter_results",
+        Config.GEMINI_FAST_MODEL,
+        FilteredResults,
+        Prompts.FILTER_RESULTS,
+        [
+            {"type": "text", "text": str(SAMPLE_STATIC_ANALYSIS.model_dump())},
+            {"type": "text", "text": str(SAMPLE_DIFF_ANALYSIS.model_dump())},
+        ],
+        args.runs
+    )
+
+    if args.image:
+        with open(args.image, "rb") as image_file:
+            image_data = base64.b64encode(image_file.read()).decode("utf-8")
+
+        benchmark(
+            "analyze_static_frame",
+            Config.GEMINI_VISION_MODEL,
+            StaticAnalysis,
+            Prompts.ANALYZE_STATIC_FRAME,
+            [{"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_data}"}}],
+            args.runs
+        )
+
+
+if __name__ == "__main__":
+    main()
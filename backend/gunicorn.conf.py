@@ -0,0 +1,11 @@
+from app.core.config import Config
+
+
+def on_starting(server):
+    # Warm up in the gunicorn master, before the workers are forked, rather than as a
+    # side effect of importing `app`, so that other entry points such as
+    # `python -m app.bootstrap` never pay for it.
+    if Config.WARM_UP:
+        from app.core.warmup import warm_up
+
+        warm_up()